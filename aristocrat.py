@@ -1,13 +1,12 @@
 from selenium import webdriver
 from selenium.webdriver.support.ui import WebDriverWait
-from bs4 import BeautifulSoup
-import requests
-from requests.exceptions import RequestException
 from typing import Optional
 import selenium.common.exceptions as slex
 from datetime import datetime
 import csv
 
+from helpers import decode_reel_stops, encode_reel_stops
+
 
 # Check to see if game action belongs to passed tuple of options
 # actions include: "spin", "normal", "spin_OR_gamble", or "winLines"
@@ -40,12 +39,27 @@ class AristocratSlotSession:
     Wager: Wager placed. As of now we do not have the option to change this.
     Win: Amount won on spin
     Balance: Balance post-win
+    Stops: (only if record_stops=True) reel stops and visible symbols of the spin. See helpers.encode_reel_stops.
+
+    With free spins, the stops are those of the spin that was paid for. If the stops of the first STOPS_CHECK_SPINS
+    spins can't be used to rebuild the reel strips, recording stops is switched off (see check_reel_stops).
     """
 
     # Header for saving files to CSV
     CSV_HEADER = ('Time', 'Wager', 'Win', 'Balance')
 
-    def __init__(self, url, headless: bool = True, sound: bool = False):
+    # Returns [stop, symbols] for each reel. The stop is the reel offset in units of the symbol height, and symbols
+    # are included if the page exposes them. This has NOT been checked against the live page: reels['position'] is
+    # what PageLoaded uses to tell when the reels are drawn, so it may describe the reel's box on screen rather than
+    # where it stopped (in which case every spin gets the same stop). check_reel_stops catches this.
+    REEL_STOPS_SCRIPT = ("return reels['position'].map(function (reel, i) {"
+                         " return [Math.round(reel['y'] / reel['height']),"
+                         " reels['symbols'] ? reels['symbols'][i] : []]; });")
+
+    # Number of spins after which we check that the recorded stops are usable
+    STOPS_CHECK_SPINS = 20
+
+    def __init__(self, url, headless: bool = True, sound: bool = False, record_stops: bool = False):
 
         self.url = url
 
@@ -55,6 +69,16 @@ class AristocratSlotSession:
         # Is sound enabled?
         self.sound = sound
 
+        # File that exception_quit saves the outcomes to
+        self.results_file = 'slot_results.csv'
+
+        # Do we record reel stops with each outcome?
+        self.record_stops = record_stops
+
+        # Stops of the first spins, until we have checked them. If they are not usable, we record '' instead.
+        self.stops_to_check = list()
+        self.stops_usable = True
+
         options = webdriver.ChromeOptions()
 
         if headless:
@@ -69,7 +93,7 @@ class AristocratSlotSession:
         self.driver.quit()
 
         if len(self.outcomes) > 0:
-            self.save_results()
+            self.save_results(to=self.results_file)
 
         if err_message is None:
             raise e
@@ -88,7 +112,44 @@ class AristocratSlotSession:
         cmd = "return game.getCash(game.config['win']);"
         return float(self.driver.execute_script(cmd))
 
+    def get_reel_stops(self):
+        # If the stops can't be read (or aren't in the expected form), record nothing rather than lose the session
+        try:
+            return encode_reel_stops(self.driver.execute_script(self.REEL_STOPS_SCRIPT))
+        except (TypeError, ValueError, slex.JavascriptException):
+            return ''
+
+    def check_reel_stops(self, stops: str):
+        """
+        Once STOPS_CHECK_SPINS spins have been recorded, make sure their stops can be used to rebuild the reel strips:
+        the reels must stop in different places, and the visible symbols must be included. If not, REEL_STOPS_SCRIPT
+        doesn't work for this game, so we stop recording stops and blank the ones recorded so far.
+        """
+
+        if self.stops_to_check is None:
+            return
+
+        self.stops_to_check.append(decode_reel_stops(stops))
+        if len(self.stops_to_check) < self.STOPS_CHECK_SPINS:
+            return
+
+        spins = [spin for spin in self.stops_to_check if spin]
+        positions = {tuple(stop for stop, _ in spin) for spin in spins}
+        has_symbols = any(symbols for spin in spins for _, symbols in spin)
+        self.stops_to_check = None
+
+        if len(positions) < 2 or not has_symbols:
+            print(f"Warning: the reel stops of the first {self.STOPS_CHECK_SPINS} spins could not be read, "
+                  "never changed, or had no symbols. Reel stops will not be recorded for this session.")
+            self.stops_usable = False
+            self.outcomes = [outcome[:4] + ('',) for outcome in self.outcomes]
+
     def get_true_url(self):
+        # Only needed to load the page, so we import these here to keep importing this module cheap
+        from bs4 import BeautifulSoup
+        import requests
+        from requests.exceptions import RequestException
+
         # use Beautiful Soup to fetch page source
         try:
             r = requests.get(self.url).text
@@ -117,8 +178,8 @@ class AristocratSlotSession:
             self.driver.execute_script(cmd)
 
         # create initial row
-        # (time, wager, win, balance)
-        self.outcomes.append((str(datetime.now()), 0.0, 0.0, self.get_balance()))
+        # (time, wager, win, balance[, stops])
+        self.outcomes.append((str(datetime.now()), 0.0, 0.0, self.get_balance()) + (('',) if self.record_stops else ()))
 
     def spin_cycle(self):
         # Hit spin command, wait until we're spinning, and then wait until we stop spinning
@@ -138,11 +199,16 @@ class AristocratSlotSession:
 
         # record time of spin
         spin_time = str(datetime.now())
+        stops = None
 
         while True:
             # spin once
             self.spin_cycle()
 
+            # keep the stops of the paid spin, not those of any free spins that follow
+            if self.record_stops and stops is None:
+                stops = self.get_reel_stops() if self.stops_usable else ''
+
             # stop there if we don't have free spins
             if not bool(self.driver.execute_script("return game.config.freeSpin;")):
                 break
@@ -152,8 +218,13 @@ class AristocratSlotSession:
         wager = self.get_wager()
         win = self.get_win()
 
+        if self.record_stops:
+            self.check_reel_stops(stops)
+            if not self.stops_usable:
+                stops = ''
+
         # store result
-        result = (spin_time, wager, win, balance)
+        result = (spin_time, wager, win, balance) + ((stops,) if self.record_stops else ())
         self.outcomes.append(result)
         return result
 
@@ -185,7 +256,7 @@ class AristocratSlotSession:
                 writer = csv.writer(f, quotechar='"', quoting=csv.QUOTE_NONNUMERIC)  # quote the date...
 
                 if header:
-                    writer.writerow(self.CSV_HEADER)
+                    writer.writerow(self.CSV_HEADER + (('Stops',) if self.record_stops else ()))
 
                 for result in self.outcomes:
                     writer.writerow(result)
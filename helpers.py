@@ -3,6 +3,10 @@ helpers.py: helper functions for IGT slot player
 """
 
 from urllib.parse import urlunparse, urlencode
+from os import listdir
+from os.path import isfile, join
+import csv
+import math
 
 # Identifiers for IGT games
 # Software ID: Unique ID for the game
@@ -26,6 +30,19 @@ game = {'buffalo': '3013', '50_dragons': '3007', 'geisha': '1699', 'miss_kitty':
         'sun_moon': '1701', 'red_baron': '3017', '50_lions': '3008', 'fire_light': '4182'}
 
 
+def get_brand_from_name(name):
+    """
+    Find which brand a game belongs to (keys in the dictionaries above)
+    """
+
+    if name in softwareid:
+        return 'igt'
+    if name in game:
+        return 'aristocrat'
+
+    raise ValueError(f"Unknown game '{name}'!")
+
+
 def get_url_from_name(name, brand='igt'):
     """
     Use the name of the game (keys in the dictionaries above) to construct a valid URL
@@ -59,3 +76,85 @@ def get_url_from_name(name, brand='igt'):
 
     return urlunparse((scheme, netloc, path, params, query_str, fragment))
 
+
+# Reel stops are stored compactly in a single CSV column: reels are separated by '|', and each reel is written as
+# its stop position, optionally followed by the visible symbols (top to bottom). E.g. '12:A,K,Q|3:J,J,10|...'
+def encode_reel_stops(reels):
+    """
+    Encode a list of (stop, symbols) pairs, one per reel. symbols may be empty if only positions are known.
+    Stops must be integers and symbols must be non-empty strings without any of the separators ',', ':' or '|'.
+    """
+
+    encoded = list()
+    for stop, symbols in reels:
+        if not isinstance(stop, int) or isinstance(stop, bool):
+            raise TypeError(f"Reel stop must be an integer, not {stop!r}")
+
+        for symbol in symbols:
+            if not isinstance(symbol, str):
+                raise TypeError(f"Reel symbol must be a string, not {symbol!r}")
+            if not symbol or any(c in symbol for c in ',:|'):
+                raise ValueError(f"Reel symbol {symbol!r} is empty or contains a separator (',', ':' or '|')")
+
+        encoded.append(f"{stop}:{','.join(symbols)}" if symbols else str(stop))
+
+    return '|'.join(encoded)
+
+
+def decode_reel_stops(text):
+    """
+    Inverse of encode_reel_stops. Returns a list of (stop, symbols) pairs, or an empty list if nothing was recorded.
+    """
+
+    reels = list()
+    for reel in filter(None, str(text).split('|')):
+        stop, _, symbols = reel.partition(':')
+        reels.append((int(stop), symbols.split(',') if symbols else []))
+
+    return reels
+
+
+def results_files(filedir):
+    """
+    Sorted paths of the files in a results directory
+    """
+
+    return sorted(join(filedir, f) for f in listdir(filedir) if isfile(join(filedir, f)))
+
+
+def read_results(filedir):
+    """
+    Iterate over the rows (as dictionaries) of every CSV file in a results directory, one file after another.
+    """
+
+    for filename in results_files(filedir):
+        with open(filename, newline='') as f:
+            yield from csv.DictReader(f)
+
+
+def load_win_ratios(filedir):
+    """
+    Win of each spin in a results directory as a multiple of the wager. Rows with a wager of 0 (page loads) are skipped.
+    """
+
+    ratios = list()
+    for row in read_results(filedir):
+        wager = float(row['Wager'])
+        if wager > 0:
+            ratios.append(float(row['Win']) / wager)
+
+    return ratios
+
+
+def win_statistics(win_ratios):
+    """
+    Statistics from the README: average RTP, probability of winning, average RTPW and coefficient of variation.
+    """
+
+    n = len(win_ratios)
+    rtp = sum(win_ratios) / n
+    hit_rate = sum(1 for r in win_ratios if r > 0) / n
+    variance = sum((r - rtp) ** 2 for r in win_ratios) / (n - 1) if n > 1 else 0.
+
+    return {'spins': n, 'rtp': rtp, 'hit_rate': hit_rate, 'rtpw': rtp / hit_rate if hit_rate > 0 else float('nan'),
+            'cv': math.sqrt(variance) / rtp if rtp > 0 else float('nan')}
@@ -111,6 +111,9 @@ class IGTSlotSession:
         # Is sound enabled?
         self.sound = sound
 
+        # File that exception_quit saves the outcomes to
+        self.results_file = 'slot_results.csv'
+
         options = webdriver.ChromeOptions()
 
         # Set user agent to a SAMSUNG device so full screen is not opened...
@@ -136,7 +139,7 @@ class IGTSlotSession:
         self.driver.quit()
 
         if len(self.outcomes) > 0:
-            self.save_results()
+            self.save_results(to=self.results_file)
 
         if err_message is None:
             raise e
@@ -0,0 +1,139 @@
+"""
+reels.py: reconstruct reel strips from recorded reel stops and compute the RTP from them
+
+Averaging wins converges slowly, because rare big wins carry much of the RTP. If we know what is on each reel, we can
+instead compute the RTP directly from a paytable. Reel stops are recorded with record_stops=True (see the Stops column
+written by AristocratSlotSession).
+
+We assume each reel stops uniformly at random and independently of the other reels. Only base-game wins are computed:
+scatters, bonus rounds and free spins are not included.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from helpers import decode_reel_stops, read_results
+
+# A spin is a list of (stop, symbols) pairs, one per reel
+Spin = List[Tuple[int, List[str]]]
+
+# Symbol -> {number of matching reels (from the left) -> pay}
+Paytable = Dict[str, Dict[int, float]]
+
+
+def load_reel_stops(filedir: str) -> List[Spin]:
+    """
+    Read the Stops column of every CSV file in a results directory. Rows without stops are skipped.
+    """
+
+    spins = list()
+    for row in read_results(filedir):
+        spin = decode_reel_stops(row.get('Stops') or '')
+        if spin:
+            spins.append(spin)
+
+    return spins
+
+
+def symbol_frequencies(spins: Sequence[Spin]) -> List[Dict[str, float]]:
+    """
+    Fraction of visible cells taken up by each symbol, for each reel. If stops are uniform, this is also the
+    frequency of each symbol on the strip.
+    """
+
+    counts = list()
+    for spin in spins:
+        for i, (_, symbols) in enumerate(spin):
+            if i == len(counts):
+                counts.append(Counter())
+            counts[i].update(symbols)
+
+    return [{symbol: n / sum(c.values()) for symbol, n in c.items()} for c in counts]
+
+
+def reconstruct_strips(spins: Sequence[Spin], lengths: Optional[Sequence[int]] = None) -> List[List[Optional[str]]]:
+    """
+    Rebuild each reel strip by placing the visible symbols of every spin at its stop position.
+    Where observations disagree, the most common symbol wins. Positions that were never seen are None.
+
+    If lengths is None, the length of each strip is taken to be one more than the largest stop observed.
+    """
+
+    if len(spins) == 0:
+        raise ValueError("No reel stops recorded! Play with record_stops=True first.")
+
+    num_reels = max(len(spin) for spin in spins)
+
+    if lengths is None:
+        lengths = [1 + max(spin[i][0] for spin in spins if i < len(spin)) for i in range(num_reels)]
+    elif len(lengths) != num_reels:
+        raise ValueError(f"Got {len(lengths)} strip lengths, but the spins have {num_reels} reels.")
+
+    votes = [[Counter() for _ in range(length)] for length in lengths]
+    for spin in spins:
+        for i, (stop, symbols) in enumerate(spin):
+            for row, symbol in enumerate(symbols):
+                votes[i][(stop + row) % lengths[i]][symbol] += 1
+
+    return [[v.most_common(1)[0][0] if v else None for v in reel] for reel in votes]
+
+
+def _window_stats(strip: Sequence[str], rows: int, symbol: str, wild: Optional[str]) -> Tuple[float, float]:
+    # expected number of cells in the window showing symbol (or wild), and probability that none do
+    matches = [s == symbol or (wild is not None and s == wild) for s in strip]
+    windows = [sum(matches[(stop + row) % len(strip)] for row in range(rows)) for stop in range(len(strip))]
+    return sum(windows) / len(strip), sum(w == 0 for w in windows) / len(strip)
+
+
+def _check_strips(strips: Sequence[Sequence[Optional[str]]]):
+    if any(s is None for strip in strips for s in strip):
+        raise ValueError("Some strip positions were never observed! Record more spins (with symbols) to fill them.")
+
+
+def ways_rtp(strips: Sequence[Sequence[str]], rows: Sequence[int], paytable: Paytable,
+             wild: Optional[str] = None) -> float:
+    """
+    Base-game RTP of a "ways" game (e.g. Siberian Storm), where a symbol pays once for each combination of cells
+    showing it on consecutive reels from the left. rows is the number of visible cells on each reel, and pays are
+    multiples of the total wager per way. The wild substitutes for every symbol, as in lines_rtp.
+
+    Reels are independent, so the expected number of ways of k reels is the product of the expected count on each
+    reel times the probability that the next reel shows none.
+    """
+
+    _check_strips(strips)
+
+    rtp = 0.
+    for symbol, pays in paytable.items():
+        stats = [_window_stats(strip, n, symbol, wild) for strip, n in zip(strips, rows)]
+
+        ways = 1.
+        for k, (expected_count, _) in enumerate(stats, start=1):
+            ways *= expected_count
+            rtp += pays.get(k, 0.) * ways * (stats[k][1] if k < len(stats) else 1.)
+
+    return rtp
+
+
+def lines_rtp(strips: Sequence[Sequence[str]], paytable: Paytable, wild: Optional[str] = None) -> float:
+    """
+    Base-game RTP of a lines game, where each line pays for a symbol on consecutive reels from the left.
+    Pays are multiples of the line bet. Every cell of a reel shows a given symbol with the same probability, so each
+    line has the same expected win, and the RTP does not depend on the number or shape of the lines.
+
+    The wild substitutes for every symbol, and a line that only counts because of wilds is paid for each symbol
+    it could stand for. This slightly overstates the RTP if wilds are common.
+    """
+
+    _check_strips(strips)
+
+    rtp = 0.
+    for symbol, pays in paytable.items():
+        p = [_window_stats(strip, 1, symbol, wild)[0] for strip in strips]
+
+        p_run = 1.
+        for k, p_k in enumerate(p, start=1):
+            p_run *= p_k
+            rtp += pays.get(k, 0.) * p_run * (1. - p[k] if k < len(p) else 1.)
+
+    return rtp
@@ -0,0 +1,237 @@
+"""
+simulator.py: Monte Carlo simulation of gambling sessions (bankroll trajectories)
+
+The recorded spins tell us about the distribution of returns on a single spin. To answer session-level questions
+(risk of ruin, how long a bankroll lasts, distribution of the final balance) we draw returns from that distribution
+and play out many sessions at once with NumPy. All amounts are expressed as multiples of the wager.
+"""
+
+from os.path import isdir, join
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from helpers import game, load_win_ratios, softwareid
+
+# Bins used to group returns in siberian_storm_analysis.py (see rtp_dist.png)
+DEFAULT_BINS = (-1, 0, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Binned PMFs of 20-line and 1-line Cleopatra. See https://casino.guru/cleopatra-slot-math
+# Each win category is represented by the midpoint of its interval, and probabilities are scaled to a 95.025% payout.
+CLEOPATRA_20_LINE = (
+    np.array([0., 0.35, 0.75, 1.5, 3.5, 7.5, 15., 35., 75., 150., 350., 750.]),
+    0.7987446566693283 * np.array(
+        [929482, 740452, 563289, 1031867, 149001, 92050, 58006, 17450, 3538, 505, 20]) / 10000000.
+)
+
+CLEOPATRA_1_LINE = (
+    np.array([0., 3.5, 7.5, 15., 35., 75., 150., 350., 750., 1500., 3500., 7500., 15000.]),
+    0.7233308569575265 * np.array(
+        [8761210, 628815, 1008567, 544354, 273149, 82322, 52222, 8952, 1532, 411, 21, 6]) / 100000000.
+)
+
+
+def pmf_from_win_ratios(win_ratios: Sequence[float],
+                        bins: Optional[Sequence[float]] = DEFAULT_BINS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a PMF (values, probabilities) from observed win ratios.
+
+    If bins is None, the empirical distribution is returned (one entry per distinct ratio). Otherwise the ratios are
+    grouped into bins and each bin is represented by the mean of its observations, which smooths the tail without
+    changing the average RTP. Ratios beyond the last bin are kept as their own entries, since they matter most
+    for the tail.
+    """
+
+    win_ratios = np.asarray(win_ratios, dtype=float)
+
+    if bins is None:
+        values, counts = np.unique(win_ratios, return_counts=True)
+        return values, counts / counts.sum()
+
+    edges = np.asarray(bins, dtype=float)
+    in_range = win_ratios <= edges[-1]
+
+    # bins are closed on the right, as with pd.cut
+    idx = np.searchsorted(edges, win_ratios[in_range], side='left') - 1
+    counts = np.bincount(idx, minlength=len(edges) - 1)
+    sums = np.bincount(idx, weights=win_ratios[in_range], minlength=len(edges) - 1)
+
+    occupied = counts > 0
+    values = np.concatenate([sums[occupied] / counts[occupied], win_ratios[~in_range]])
+    counts = np.concatenate([counts[occupied], np.ones(np.count_nonzero(~in_range))])
+
+    return values, counts / counts.sum()
+
+
+def pmf_from_table(values: Sequence[float], probabilities: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a PMF from a table of win categories (such as the Cleopatra tables above).
+    If the probabilities sum to less than 1, the remainder is assigned to a loss (a return of 0).
+    """
+
+    values = np.asarray(values, dtype=float)
+    probabilities = np.asarray(probabilities, dtype=float)
+
+    if len(probabilities) == len(values) - 1:
+        probabilities = np.concatenate([[1. - probabilities.sum()], probabilities])
+
+    if len(probabilities) != len(values):
+        raise ValueError("Need one probability per value (or one fewer, if the first value is a loss).")
+
+    if np.any(probabilities < 0) or not np.isclose(probabilities.sum(), 1.):
+        raise ValueError("Probabilities must be non-negative and sum to 1.")
+
+    return values, probabilities
+
+
+class SessionResults:
+    """
+    Outcome of a batch of simulated sessions. Each array has one entry per session:
+
+    final_balance: balance when the session ended (multiple of the wager)
+    num_spins: number of spins played
+    ruined: True if the balance dropped below one wager
+    reached_target: True if the balance reached the target
+    """
+
+    def __init__(self, final_balance: np.ndarray, num_spins: np.ndarray, ruined: np.ndarray,
+                 reached_target: np.ndarray):
+
+        self.final_balance = final_balance
+        self.num_spins = num_spins
+        self.ruined = ruined
+        self.reached_target = reached_target
+
+    def __len__(self):
+        return len(self.final_balance)
+
+    @property
+    def risk_of_ruin(self) -> float:
+        return float(self.ruined.mean())
+
+    @property
+    def target_probability(self) -> float:
+        return float(self.reached_target.mean())
+
+    @property
+    def mean_session_length(self) -> float:
+        return float(self.num_spins.mean())
+
+    def final_balance_quantiles(self, q: Iterable[float] = (0.05, 0.25, 0.5, 0.75, 0.95)) -> Dict[float, float]:
+        q = tuple(q)
+        return dict(zip(q, np.quantile(self.final_balance, q).tolist()))
+
+    def summary(self) -> dict:
+        return {'sessions': len(self),
+                'risk_of_ruin': self.risk_of_ruin,
+                'target_probability': self.target_probability,
+                'mean_session_length': self.mean_session_length,
+                'median_session_length': float(np.median(self.num_spins)),
+                'mean_final_balance': float(self.final_balance.mean()),
+                'final_balance_quantiles': self.final_balance_quantiles()}
+
+
+def simulate_sessions(values: Sequence[float], probabilities: Optional[Sequence[float]] = None,
+                      bankroll: float = 100., max_spins: int = 1000, target: Optional[float] = None,
+                      num_sessions: int = 100000, batch_size: int = 100000, chunk_size: int = 64,
+                      seed: Optional[int] = None) -> SessionResults:
+    """
+    Simulate num_sessions independent sessions, each starting with a bankroll (in multiples of the wager).
+
+    A session stops when the balance can no longer cover a wager (ruin), when the balance reaches the target
+    (if given), or after max_spins spins. Returns are drawn from the PMF (values, probabilities); if probabilities
+    is None, values are treated as observed returns and drawn uniformly (the empirical distribution).
+
+    Sessions are played batch_size at a time, chunk_size spins at a time. Only sessions that are still running are
+    carried into the next chunk, so early stopping also saves work.
+    """
+
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        raise ValueError("Need at least one return to draw from.")
+
+    if probabilities is not None:
+        values, probabilities = pmf_from_table(values, probabilities)
+        cdf = np.cumsum(probabilities)
+        cdf[-1] = 1.
+
+    if bankroll < 1:
+        raise ValueError("The bankroll must cover at least one wager.")
+
+    if target is not None and target <= bankroll:
+        raise ValueError("The target must be larger than the bankroll.")
+
+    rng = np.random.default_rng(seed)
+
+    def draw(shape):
+        if probabilities is None:
+            return values[rng.integers(len(values), size=shape)]
+        return values[np.searchsorted(cdf, rng.random(shape), side='right')]
+
+    final_balance = np.empty(num_sessions)
+    num_spins = np.empty(num_sessions, dtype=np.int64)
+    ruined = np.zeros(num_sessions, dtype=bool)
+    reached_target = np.zeros(num_sessions, dtype=bool)
+
+    for start in range(0, num_sessions, batch_size):
+        stop = min(start + batch_size, num_sessions)
+
+        # sessions in this batch that are still running
+        active = np.arange(start, stop)
+        balance = np.full(len(active), float(bankroll))
+        spins = 0
+
+        while len(active) > 0 and spins < max_spins:
+            n = min(chunk_size, max_spins - spins)
+
+            # balance after each spin in this chunk (we pay the wager, then collect the win)
+            path = balance[:, None] + np.cumsum(draw((len(active), n)) - 1., axis=1)
+
+            stopped = path < 1.
+            if target is not None:
+                stopped |= path >= target
+
+            done = stopped.any(axis=1)
+            first = np.where(done, stopped.argmax(axis=1), n - 1)
+            end_balance = path[np.arange(len(active)), first]
+
+            finished = active[done]
+            final_balance[finished] = end_balance[done]
+            num_spins[finished] = spins + first[done] + 1
+            ruined[finished] = end_balance[done] < 1.
+            reached_target[finished] = ~ruined[finished]
+
+            active = active[~done]
+            balance = end_balance[~done]
+            spins += n
+
+        # anything left played every spin
+        final_balance[active] = balance
+        num_spins[active] = spins
+
+    return SessionResults(final_balance, num_spins, ruined, reached_target)
+
+
+def compare_games(results_dir: str = './results', names: Optional[Iterable[str]] = None,
+                  bins: Optional[Sequence[float]] = DEFAULT_BINS, **kwargs) -> Dict[str, SessionResults]:
+    """
+    Simulate sessions for every game with recorded spins (results_dir/<name>/), using the same settings for each.
+    By default all games in helpers.py are considered. Keyword arguments are passed on to simulate_sessions.
+    """
+
+    if names is None:
+        names = list(softwareid) + list(game)
+
+    results = dict()
+    for name in names:
+        filedir = join(results_dir, name)
+        if not isdir(filedir):
+            continue
+
+        win_ratios = load_win_ratios(filedir)
+        if len(win_ratios) == 0:
+            continue
+
+        results[name] = simulate_sessions(*pmf_from_win_ratios(win_ratios, bins=bins), **kwargs)
+
+    return results
@@ -0,0 +1,260 @@
+"""
+slotenium.py: command line interface for playing, analyzing and simulating slot games
+
+    python slotenium.py games
+    python slotenium.py play siberian_storm --spins 500 --workers 4
+    python slotenium.py analyze siberian_storm
+    python slotenium.py validate siberian_storm
+    python slotenium.py benchmark siberian_storm --sessions 1000000
+
+Heavy dependencies (Selenium, NumPy, ...) are only imported by the subcommands that need them, so that listing
+games or computing statistics starts quickly, and so do many short-lived worker processes.
+"""
+
+import argparse
+import csv
+import signal
+import sys
+from datetime import datetime
+from os import getpid, makedirs
+from os.path import isdir, join
+from typing import Optional
+
+from helpers import decode_reel_stops, game, get_brand_from_name, get_url_from_name, load_win_ratios, \
+    results_files, softwareid, win_statistics
+
+RESULTS_DIR = './results'
+
+
+def results_dir_from_arg(name_or_dir: str, results_dir: str = RESULTS_DIR) -> Optional[str]:
+    # Accept either a directory or the name of a game with results in results_dir/<name>/
+    filedir = name_or_dir if isdir(name_or_dir) else join(results_dir, name_or_dir)
+
+    if not isdir(filedir):
+        print(f"No results found for '{name_or_dir}'! Expected a directory or a game in {results_dir}.")
+        return None
+
+    return filedir
+
+
+def games(args):
+    for name in softwareid:
+        print(f"{name} (igt)")
+    for name in game:
+        print(f"{name} (aristocrat)")
+
+
+def play_session(name: str, brand: str, num_spins, headless: bool, sound: bool, record_stops: bool, to: str):
+    """
+    Play a single session and save the outcomes. This runs in each worker process.
+    """
+
+    if brand == 'igt':
+        from igt import IGTSlotSession as SlotSession
+    else:
+        from aristocrat import AristocratSlotSession as SlotSession
+
+    # Only AristocratSlotSession can record reel stops
+    kwargs = {'record_stops': True} if record_stops else {}
+
+    session = SlotSession(get_url_from_name(name, brand=brand), headless=headless, sound=sound, **kwargs)
+
+    # If the session fails, exception_quit saves here too (rather than to its default file)
+    session.results_file = to
+
+    try:
+        session.load_game()
+        session.spin(num_spins=num_spins)
+    except KeyboardInterrupt:  # spin() handles this itself, but we may be interrupted while loading
+        print("\nSession terminated by user.")
+    finally:
+        # Don't let another Ctrl-C stop us from saving and closing the browser
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        session.save_results(to=to)
+        session.close()
+
+
+def play(args):
+    if args.workers < 1:
+        print("Need at least one worker!")
+        return 1
+
+    try:
+        brand = args.brand or get_brand_from_name(args.name)
+    except ValueError as e:
+        print(f"{e} See the games command.")
+        return 1
+
+    if args.name not in (softwareid if brand == 'igt' else game):
+        print(f"'{args.name}' is not an {brand} game! See the games command.")
+        return 1
+
+    if args.record_stops and brand != 'aristocrat':
+        print("Reel stops can only be recorded for Aristocrat games!")
+        return 1
+
+    output_dir = args.output or join(RESULTS_DIR, args.name)
+    makedirs(output_dir, exist_ok=True)
+
+    # Each session gets its own file, so results from several runs can sit in the same directory.
+    # The PID keeps runs started in the same second (e.g. by a scheduler) from overwriting each other.
+    stamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{getpid()}"
+    jobs = [(args.name, brand, args.spins, args.headless, args.sound, args.record_stops,
+             join(output_dir, f"slot_results_{stamp}_{i + 1}.csv")) for i in range(args.workers)]
+
+    if args.workers == 1:
+        play_session(*jobs[0])
+        return
+
+    from multiprocessing import Process
+
+    workers = [Process(target=play_session, args=job) for job in jobs]
+    for worker in workers:
+        worker.start()
+
+    # Ctrl-C reaches every worker, and each one stops spinning, saves its results and closes its browser.
+    # The parent ignores it (the workers were started with the default handler) and waits for them to finish.
+    handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        for worker in workers:
+            worker.join()
+    finally:
+        signal.signal(signal.SIGINT, handler)
+
+    return 1 if any(worker.exitcode != 0 for worker in workers) else 0
+
+
+def analyze(args):
+    filedir = results_dir_from_arg(args.name)
+    if filedir is None:
+        return 1
+
+    win_ratios = load_win_ratios(filedir)
+
+    if len(win_ratios) == 0:
+        print("No spins found!")
+        return 1
+
+    stats = win_statistics(win_ratios)
+    print(f"We have {stats['spins']} observations.")
+    print(f"Average RTP: {stats['rtp']}")
+    print(f"Win probability: {stats['hit_rate']}")
+    print(f"Average RTPW: {stats['rtpw']}")
+    print(f"CV: {stats['cv']}")
+
+
+def validate(args):
+    """
+    Check that every row can be read, and that the balance adds up: previous balance - wager + win = balance.
+    Rows with a wager of 0 are page (re-)loads, which reset the balance.
+    """
+
+    filedir = results_dir_from_arg(args.name)
+    if filedir is None:
+        return 1
+
+    problems = 0
+    for filename in results_files(filedir):
+        with open(filename, newline='') as f:
+            balance = None
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                try:
+                    wager, win, new_balance = float(row['Wager']), float(row['Win']), float(row['Balance'])
+                    decode_reel_stops(row.get('Stops') or '')
+                except (KeyError, TypeError, ValueError) as e:
+                    print(f"{filename}, row {line}: could not read row ({e})")
+                    problems += 1
+                    balance = None
+                    continue
+
+                if wager < 0 or win < 0:
+                    print(f"{filename}, row {line}: negative wager or win")
+                    problems += 1
+                elif wager > 0 and balance is not None and abs(balance - wager + win - new_balance) > 1e-6:
+                    print(f"{filename}, row {line}: balance {new_balance} does not match {balance} - {wager} + {win}")
+                    problems += 1
+
+                balance = new_balance
+
+    print(f"{problems} problem(s) found.")
+    return 1 if problems > 0 else 0
+
+
+def benchmark(args):
+    import time
+    from simulator import pmf_from_win_ratios, simulate_sessions
+
+    filedir = results_dir_from_arg(args.name)
+    if filedir is None:
+        return 1
+
+    start = time.perf_counter()
+    win_ratios = load_win_ratios(filedir)
+    if len(win_ratios) == 0:
+        print("No spins found!")
+        return 1
+
+    values, probabilities = pmf_from_win_ratios(win_ratios)
+    loaded = time.perf_counter()
+
+    try:
+        results = simulate_sessions(values, probabilities, bankroll=args.bankroll, max_spins=args.max_spins,
+                                    target=args.target, num_sessions=args.sessions, seed=args.seed)
+    except ValueError as e:  # e.g. a bankroll below one wager, or a target below the bankroll
+        print(e)
+        return 1
+    finished = time.perf_counter()
+
+    summary = results.summary()
+    print(f"Loaded spins in {loaded - start:.3f}s")
+    print(f"Simulated {args.sessions} sessions ({results.num_spins.sum()} spins) in {finished - loaded:.3f}s")
+    print(f"Risk of ruin: {summary['risk_of_ruin']}")
+    print(f"Mean session length: {summary['mean_session_length']}")
+    print(f"Mean final balance: {summary['mean_final_balance']}")
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='slotenium', description='Play, analyze and simulate slot games.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('games', help='list the games in helpers.py')
+    p.set_defaults(func=games)
+
+    p = subparsers.add_parser('play', help='play a game and save the outcomes')
+    p.add_argument('name', help='game name (see the games command)')
+    p.add_argument('--brand', choices=('igt', 'aristocrat'), help='inferred from the name by default')
+    p.add_argument('--spins', type=int, default=None, help='spins per session (default: until interrupted)')
+    p.add_argument('--show', dest='headless', action='store_false', help='open a visible browser window')
+    p.add_argument('--sound', action='store_true')
+    p.add_argument('--record-stops', action='store_true', help='record reel stops (Aristocrat only, experimental)')
+    p.add_argument('--workers', type=int, default=1, help='number of sessions to play in parallel')
+    p.add_argument('--output', help=f'output directory (default: {RESULTS_DIR}/<name>)')
+    p.set_defaults(func=play)
+
+    p = subparsers.add_parser('analyze', help='compute RTP, win probability, RTPW and CV')
+    p.add_argument('name', help=f'results directory, or game name with results in {RESULTS_DIR}/<name>')
+    p.set_defaults(func=analyze)
+
+    p = subparsers.add_parser('validate', help='check results files for unreadable rows and inconsistent balances')
+    p.add_argument('name', help=f'results directory, or game name with results in {RESULTS_DIR}/<name>')
+    p.set_defaults(func=validate)
+
+    p = subparsers.add_parser('benchmark', help='time the session simulator on recorded spins')
+    p.add_argument('name', help=f'results directory, or game name with results in {RESULTS_DIR}/<name>')
+    p.add_argument('--sessions', type=int, default=100000)
+    p.add_argument('--bankroll', type=float, default=100., help='starting balance (multiples of the wager)')
+    p.add_argument('--target', type=float, default=None, help='stop once the balance reaches this')
+    p.add_argument('--max-spins', type=int, default=1000)
+    p.add_argument('--seed', type=int, default=None)
+    p.set_defaults(func=benchmark)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = get_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())